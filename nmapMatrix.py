@@ -1,6 +1,11 @@
+import collections
 import glob
+import html
 import os
 import re
+import socket
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 # ANSI colour codes for terminal output
 RED = "\033[91m"
@@ -10,8 +15,21 @@ CYAN = "\033[96m"
 RESET = "\033[0m"
 BOLD = "\033[1m"
 
+# Read buffer for .gnmap files; merged scans can run to hundreds of MB
+READ_BUFFER_SIZE = 1 << 20
+# Combined .gnmap size above which files are parsed in separate processes
+PARALLEL_MIN_BYTES = 8 << 20
+
+_ANSI_RE = re.compile(r'\x1b\[[0-9;]*m')
+# Open (or open|filtered) state of a port entry in a gnmap "Ports:" field, e.g.
+# 22/open/tcp//ssh/// -- anchored on the port number so service names such
+# as //openvpn/// on a closed port do not match
+_OPEN_PORT_RE = re.compile(r'\d/open[/|]')
+# Segment file name (without extension), e.g. "PCI - pro_pci" or "NON PCI - corp"
+_SEG_RE = re.compile(r'(pci|non pci) -\s*(.*?)\s*$', re.IGNORECASE)
+
 def strip_ansi(s):
-    return re.sub(r'\x1b\[[0-9;]*m', '', s)
+    return _ANSI_RE.sub('', s) if '\x1b' in s else s
 
 def pad_cell(s, width):
     real_len = len(strip_ansi(s))
@@ -20,169 +38,240 @@ def pad_cell(s, width):
 # Helper to get segment type and name from filename
 def parse_segment(filename):
     base = os.path.splitext(filename)[0]
-    if base.lower().startswith("pci -"):
-        return "pci", base[6:].strip()
-    elif base.lower().startswith("non pci -"):
-        return "non_pci", base[10:].strip()
-    else:
+    m = _SEG_RE.match(base)
+    if not m:
         return "unknown", base
+    seg_type = "pci" if m.group(1).lower() == "pci" else "non_pci"
+    return seg_type, m.group(2)
 
-# Find all .gnmap files in the current directory
-gnmap_files = glob.glob("*.gnmap")
+# Sort key for hosts: addresses in numeric order (IPv4 before IPv6), then
+# any hostnames alphabetically. inet_pton parses in C, far cheaper than
+# building an ipaddress object per host
+def host_sort_key(host):
+    try:
+        return (0, 4, socket.inet_pton(socket.AF_INET, host))
+    except OSError:
+        pass
+    # IPv6 link-local addresses may carry a zone, e.g. fe80::1%eth0
+    addr, _, scope = host.partition("%")
+    try:
+        return (0, 6, socket.inet_pton(socket.AF_INET6, addr), scope)
+    except OSError:
+        return (1, 0, host)
 
-segment_hosts = {}
-segment_types = {}
-
-for gnmap_file in gnmap_files:
+# Parse one .gnmap file into (segment type, segment name, hosts with open ports)
+def _parse_file(gnmap_file):
     seg_type, seg_name = parse_segment(gnmap_file)
-    segment_types[seg_name] = seg_type
     hosts = set()
-    with open(gnmap_file, "r") as f:
+    hosts_add = hosts.add
+    open_port = _OPEN_PORT_RE.search
+    with open(gnmap_file, "r", buffering=READ_BUFFER_SIZE) as f:
         for line in f:
-            if line.startswith("Host:"):
-                parts = line.split()
-                ip = parts[1]
-                if "Ports:" in line and "open" in line:
-                    hosts.add(ip)
-    segment_hosts[seg_name] = hosts
-
-# Collect all unique hosts
-all_hosts = set()
-for hosts in segment_hosts.values():
-    all_hosts.update(hosts)
-all_hosts = sorted(all_hosts)
-
-# Sort segments: PCI first, then NON PCI, then unknown
-pci_segments = [seg for seg, typ in segment_types.items() if typ == "pci"]
-non_pci_segments = [seg for seg, typ in segment_types.items() if typ == "non_pci"]
-unknown_segments = [seg for seg, typ in segment_types.items() if typ not in ("pci", "non_pci")]
-ordered_segments = pci_segments + non_pci_segments + unknown_segments
-
-# Set column widths for terminal output
-host_col_width = max(15, max(len(h) for h in all_hosts) + 2)
-seg_col_width = max(15, max(len(seg) for seg in segment_hosts.keys()) + 2)
-
-# Print PCI/NON PCI Segment Table
-print(f"{BOLD}Segment Classification:{RESET}")
-print(f"{GREEN}PCI Segments:{RESET} {', '.join(pci_segments) if pci_segments else 'None'}")
-print(f"{YELLOW}NON PCI Segments:{RESET} {', '.join(non_pci_segments) if non_pci_segments else 'None'}")
-print("-" * (host_col_width + seg_col_width * len(segment_hosts)))
-
-# Print a key/legend
-print(f"{BOLD}Key:{RESET}")
-print(f"{GREEN}X{RESET} = Host is reachable from this segment (at least one open port found)")
-print(f"{YELLOW}X{RESET} = Host is reachable from multiple segments (potential segmentation issue)")
-print(f"{RED}X{RESET} = Host is reachable from both PCI and non-PCI segments (critical concern)")
-print("-" * (host_col_width + seg_col_width * len(segment_hosts)))
-
-# Print a communication matrix with segments as columns (PCI first)
-print(f"{BOLD}Communication Matrix:{RESET} (see key above)\n")
-header = pad_cell("Host", host_col_width) + " " + " ".join([pad_cell(seg, seg_col_width) for seg in ordered_segments])
-print(header)
-print("-" * len(header))
-for h in all_hosts:
-    row = pad_cell(h, host_col_width) + " "
-    segments_reaching = [seg for seg in segment_hosts if h in segment_hosts[seg]]
-    has_pci = any(segment_types.get(seg, "") == "pci" for seg in segments_reaching)
-    has_non_pci = any(segment_types.get(seg, "") == "non_pci" for seg in segments_reaching)
-    for segment in ordered_segments:
-        if h in segment_hosts[segment]:
-            if has_pci and has_non_pci:
-                cell = f"{RED}X{RESET}"
-            elif len(segments_reaching) > 1:
-                cell = f"{YELLOW}X{RESET}"
-            else:
-                cell = f"{GREEN}X{RESET}"
+            # Cheap string checks reject most lines; the regex only confirms
+            # the "/open" belongs to a port state
+            if (line.startswith("Host:") and ("/open/" in line or "/open|" in line)
+                    and open_port(line)):
+                hosts_add(line.split(None, 2)[1])
+    return seg_type, seg_name, hosts
+
+def main():
+    # Find all .gnmap files in the current directory
+    gnmap_files = glob.glob("*.gnmap")
+
+    segment_hosts = {}
+    segment_types = {}
+    max_seg_len = 0
+
+    # Processes pay off once there is real parsing to do; small inputs are
+    # cheaper to read on threads (file reads release the GIL)
+    total_size = sum(os.path.getsize(path) for path in gnmap_files)
+    if len(gnmap_files) > 1 and total_size >= PARALLEL_MIN_BYTES:
+        executor_cls = ProcessPoolExecutor
+    else:
+        executor_cls = ThreadPoolExecutor
+    with executor_cls() as ex:
+        for seg_type, seg_name, hosts in ex.map(_parse_file, gnmap_files):
+            segment_types[seg_name] = seg_type
+            segment_hosts[seg_name] = hosts
+            max_seg_len = max(max_seg_len, len(seg_name))
+
+    # Index which segments reach each host, instead of rescanning every
+    # segment per host in each report section; the same pass collects all
+    # unique hosts and the longest host name for the terminal column width
+    host_to_segs = collections.defaultdict(list)
+    max_host_len = 0
+    for seg, hs in segment_hosts.items():
+        for ip in hs:
+            segs = host_to_segs[ip]
+            if not segs and len(ip) > max_host_len:
+                max_host_len = len(ip)
+            segs.append(seg)
+    all_hosts = sorted(host_to_segs, key=host_sort_key)
+
+    # Sort segments: PCI first, then NON PCI, then unknown
+    pci_segments = [seg for seg, typ in segment_types.items() if typ == "pci"]
+    non_pci_segments = [seg for seg, typ in segment_types.items() if typ == "non_pci"]
+    unknown_segments = [seg for seg, typ in segment_types.items() if typ not in ("pci", "non_pci")]
+    ordered_segments = pci_segments + non_pci_segments + unknown_segments
+    pci_set = set(pci_segments)
+    non_pci_set = set(non_pci_segments)
+
+    # Reachability matrix: one byte per host (by position in all_hosts) for
+    # each segment, in column order, so rendering is a plain byte index
+    host_id = {h: i for i, h in enumerate(all_hosts)}
+    reach = {seg: bytearray(len(all_hosts)) for seg in ordered_segments}
+    for seg, hs in segment_hosts.items():
+        seg_reach = reach[seg]
+        for ip in hs:
+            seg_reach[host_id[ip]] = 1
+    ordered_reach = [reach[seg] for seg in ordered_segments]
+
+    # Per-host flags, reduced across whole rows at once: each row is read as
+    # one big integer so OR/AND work on every host's byte in a single C call
+    n_hosts = len(all_hosts)
+    seen = multi = pci_any = non_pci_any = 0
+    for seg, seg_reach in zip(ordered_segments, ordered_reach):
+        row_bits = int.from_bytes(seg_reach, "big")
+        multi |= seen & row_bits
+        seen |= row_bits
+        if seg in pci_set:
+            pci_any |= row_bits
+        elif seg in non_pci_set:
+            non_pci_any |= row_bits
+    # multi_seg[i] / pci_and_non_pci[i] are 1 for host i, otherwise 0
+    multi_seg = multi.to_bytes(n_hosts, "big")
+    pci_and_non_pci = (pci_any & non_pci_any).to_bytes(n_hosts, "big")
+
+    # Set column widths for terminal output
+    host_col_width = max(15, max_host_len + 2)
+    seg_col_width = max(15, max_seg_len + 2)
+
+    # Matrix cells are always one visible character wide, so pad them once up front
+    cell_pad = ' ' * (seg_col_width - 1)
+    red_cell = f"{RED}X{RESET}{cell_pad}"
+    yellow_cell = f"{YELLOW}X{RESET}{cell_pad}"
+    green_cell = f"{GREEN}X{RESET}{cell_pad}"
+    dash_cell = f"-{cell_pad}"
+    # Cell colours come from the td.r/.y/.g/.n rules in the report's <style> block
+    html_cells = {
+        'r': "<td class='r'>X</td>",  # Red
+        'y': "<td class='y'>X</td>",  # Yellow
+        'g': "<td class='g'>X</td>",  # Green
+        '-': "<td class='n'>-</td>",
+    }
+    dash_td = html_cells['-']
+    html_row_tmpl = "<tr><td>%s</td>%s</tr>\n"
+
+    # Build the terminal matrix, HTML matrix and areas of concern in a single
+    # pass over the hosts; each section below just emits its buffer
+    terminal_rows = []
+    html_rows = []
+    areas_of_concern = []
+    for i, h in enumerate(all_hosts):
+        if pci_and_non_pci[i]:
+            x_cell, x_td = red_cell, html_cells['r']
+        elif multi_seg[i]:
+            x_cell, x_td = yellow_cell, html_cells['y']
         else:
-            cell = "-"
-        row += pad_cell(cell, seg_col_width)
-    print(row)
-
-# Highlight areas of concern
-print(f"\n{BOLD}Areas of Concern:{RESET}")
-concern_found = False
-areas_of_concern = []
-for h in all_hosts:
-    segments_reaching = [seg for seg in segment_hosts if h in segment_hosts[seg]]
-    has_pci = any(segment_types.get(seg, "") == "pci" for seg in segments_reaching)
-    has_non_pci = any(segment_types.get(seg, "") == "non_pci" for seg in segments_reaching)
-    multi = len(segments_reaching) > 1
-    pci_and_nonpci = has_pci and has_non_pci
-    if multi or pci_and_nonpci:
-        concern_found = True
-        if multi:
-            msg = f"- Host {h} is reachable from multiple segments: {', '.join(segments_reaching)}"
-            print(f"{YELLOW}{msg}{RESET}")
-            areas_of_concern.append(('yellow', msg))
-        if pci_and_nonpci:
-            msg = f"[!] Host {h} is reachable from both PCI and non-PCI segments: {', '.join(segments_reaching)}"
-            print(f"{RED}{msg}{RESET}")
-            areas_of_concern.append(('red', msg))
-if not concern_found:
-    print("No areas of concern detected based on current matrix.")
-
-# Client-friendly breakdown
-print(f"\n{BOLD}Client Breakdown:{RESET}")
-print("This matrix shows which network segments can communicate with which hosts. Each 'X' means that the host was reachable from that segment during testing.")
-print(f"{YELLOW}Yellow X{RESET}: Indicates a host is reachable from more than one segment, which may suggest insufficient network segmentation.")
-print(f"{RED}Red X{RESET}: Indicates a host is reachable from both PCI and non-PCI segments, which is a critical concern for compliance and security.")
-print("We recommend reviewing any yellow or red entries to ensure your segmentation controls meet your policy and compliance requirements.")
-
-# --- HTML Output ---
-with open("segmentation_matrix.html", "w") as f:
-    f.write("<html><body>\n")
-    f.write("<h2>Segment Classification</h2>\n")
-    f.write("<ul>")
-    f.write(f"<li><b style='color:green;'>PCI Segments:</b> {', '.join(pci_segments) if pci_segments else 'None'}</li>")
-    f.write(f"<li><b style='color:orange;'>NON PCI Segments:</b> {', '.join(non_pci_segments) if non_pci_segments else 'None'}</li>")
-    f.write("</ul>")
-
-    f.write("<h2>Communication Matrix</h2>\n")
-    f.write("<table border='1' cellpadding='5' style='border-collapse:collapse;'>\n")
+            x_cell, x_td = green_cell, html_cells['g']
+        row_reach = [seg_reach[i] for seg_reach in ordered_reach]
+        terminal_rows.append(pad_cell(h, host_col_width) + " " + "".join([x_cell if r else dash_cell for r in row_reach]))
+        html_rows.append(html_row_tmpl % (html.escape(h), "".join([x_td if r else dash_td for r in row_reach])))
+        if multi_seg[i]:
+            segments_reaching = ', '.join(host_to_segs[h])
+            areas_of_concern.append(('yellow', f"- Host {h} is reachable from multiple segments: {segments_reaching}"))
+            if pci_and_non_pci[i]:
+                areas_of_concern.append(('red', f"[!] Host {h} is reachable from both PCI and non-PCI segments: {segments_reaching}"))
+
+    # Print PCI/NON PCI Segment Table
+    print(f"{BOLD}Segment Classification:{RESET}")
+    print(f"{GREEN}PCI Segments:{RESET} {', '.join(pci_segments) if pci_segments else 'None'}")
+    print(f"{YELLOW}NON PCI Segments:{RESET} {', '.join(non_pci_segments) if non_pci_segments else 'None'}")
+    print("-" * (host_col_width + seg_col_width * len(segment_hosts)))
+
+    # Print a key/legend
+    print(f"{BOLD}Key:{RESET}")
+    print(f"{GREEN}X{RESET} = Host is reachable from this segment (at least one open port found)")
+    print(f"{YELLOW}X{RESET} = Host is reachable from multiple segments (potential segmentation issue)")
+    print(f"{RED}X{RESET} = Host is reachable from both PCI and non-PCI segments (critical concern)")
+    print("-" * (host_col_width + seg_col_width * len(segment_hosts)))
+
+    # Print a communication matrix with segments as columns (PCI first)
+    print(f"{BOLD}Communication Matrix:{RESET} (see key above)\n")
+    header = pad_cell("Host", host_col_width) + " " + " ".join([pad_cell(seg, seg_col_width) for seg in ordered_segments])
+    print(header)
+    print("-" * len(header))
+    sys.stdout.write("".join([row + "\n" for row in terminal_rows]))
+
+    # Highlight areas of concern
+    print(f"\n{BOLD}Areas of Concern:{RESET}")
+    concern_colours = {'yellow': YELLOW, 'red': RED}
+    for colour, msg in areas_of_concern:
+        print(f"{concern_colours[colour]}{msg}{RESET}")
+    if not areas_of_concern:
+        print("No areas of concern detected based on current matrix.")
+
+    # Client-friendly breakdown
+    print(f"\n{BOLD}Client Breakdown:{RESET}")
+    print("This matrix shows which network segments can communicate with which hosts. Each 'X' means that the host was reachable from that segment during testing.")
+    print(f"{YELLOW}Yellow X{RESET}: Indicates a host is reachable from more than one segment, which may suggest insufficient network segmentation.")
+    print(f"{RED}Red X{RESET}: Indicates a host is reachable from both PCI and non-PCI segments, which is a critical concern for compliance and security.")
+    print("We recommend reviewing any yellow or red entries to ensure your segmentation controls meet your policy and compliance requirements.")
+
+    # --- HTML Output ---
+    # Collect the report fragments and write the file in one go
+    out = []
+    app = out.append
+    app("<html><head><style>"
+        "td.r{background:#ffcccc;text-align:center}"
+        "td.y{background:#ffff99;text-align:center}"
+        "td.g{background:#ccffcc;text-align:center}"
+        "td.n{text-align:center}"
+        "</style></head><body>\n")
+    app("<h2>Segment Classification</h2>\n")
+    app("<ul>")
+    app(f"<li><b style='color:green;'>PCI Segments:</b> {html.escape(', '.join(pci_segments)) if pci_segments else 'None'}</li>")
+    app(f"<li><b style='color:orange;'>NON PCI Segments:</b> {html.escape(', '.join(non_pci_segments)) if non_pci_segments else 'None'}</li>")
+    app("</ul>")
+
+    app("<h2>Communication Matrix</h2>\n")
+    app("<table border='1' cellpadding='5' style='border-collapse:collapse;'>\n")
     # Header
-    f.write("<tr><th>Host</th>")
+    app("<tr><th>Host</th>")
     for seg in ordered_segments:
-        if seg in pci_segments:
-            f.write(f"<th style='background:#b3d1ff;color:#003366;'>{seg}</th>")  # Blue for PCI
-        elif seg in non_pci_segments:
-            f.write(f"<th style='background:#fff2cc;color:#7f6000;'>{seg}</th>")  # Light yellow for NON PCI
+        if seg in pci_set:
+            app("<th style='background:#b3d1ff;color:#003366;'>%s</th>" % html.escape(seg))  # Blue for PCI
+        elif seg in non_pci_set:
+            app("<th style='background:#fff2cc;color:#7f6000;'>%s</th>" % html.escape(seg))  # Light yellow for NON PCI
         else:
-            f.write(f"<th>{seg}</th>")
-    f.write("</tr>\n")
+            app("<th>%s</th>" % html.escape(seg))
+    app("</tr>\n")
     # Rows
-    for h in all_hosts:
-        f.write(f"<tr><td>{h}</td>")
-        segments_reaching = [seg for seg in segment_hosts if h in segment_hosts[seg]]
-        has_pci = any(segment_types.get(seg, "") == "pci" for seg in segments_reaching)
-        has_non_pci = any(segment_types.get(seg, "") == "non_pci" for seg in segments_reaching)
-        for segment in ordered_segments:
-            if h in segment_hosts[segment]:
-                if has_pci and has_non_pci:
-                    colour = "#ffcccc"  # Red
-                elif len(segments_reaching) > 1:
-                    colour = "#ffff99"  # Yellow
-                else:
-                    colour = "#ccffcc"  # Green
-                f.write(f"<td style='background:{colour};text-align:center;'>X</td>")
-            else:
-                f.write("<td style='text-align:center;'>-</td>")
-        f.write("</tr>\n")
-    f.write("</table>\n")
-    f.write("<p><b>Key:</b><br>")
-    f.write("<span style='background:#ccffcc;'>Green</span>: Host is reachable from this segment only.<br>")
-    f.write("<span style='background:#ffff99;'>Yellow</span>: Host is reachable from multiple segments.<br>")
-    f.write("<span style='background:#ffcccc;'>Red</span>: Host is reachable from both PCI and non-PCI segments.<br>")
-    f.write("</p>\n")
+    out.extend(html_rows)
+    app("</table>\n")
+    app("<p><b>Key:</b><br>")
+    app("<span style='background:#ccffcc;'>Green</span>: Host is reachable from this segment only.<br>")
+    app("<span style='background:#ffff99;'>Yellow</span>: Host is reachable from multiple segments.<br>")
+    app("<span style='background:#ffcccc;'>Red</span>: Host is reachable from both PCI and non-PCI segments.<br>")
+    app("</p>\n")
     # Areas of Concern in HTML
-    f.write("<h2>Areas of Concern</h2>\n")
+    app("<h2>Areas of Concern</h2>\n")
+    concern_tmpls = {
+        'red': "<div style='color:#b20000;font-weight:bold;'>%s</div>\n",
+        'yellow': "<div style='color:#b59b00;'>%s</div>\n",
+    }
     if areas_of_concern:
         for colour, msg in areas_of_concern:
-            if colour == 'red':
-                f.write(f"<div style='color:#b20000;font-weight:bold;'>{msg}</div>\n")
-            elif colour == 'yellow':
-                f.write(f"<div style='color:#b59b00;'>{msg}</div>\n")
+            app(concern_tmpls[colour] % html.escape(msg))
     else:
-        f.write("<div>No areas of concern detected based on current matrix.</div>\n")
-    f.write("</body></html>\n")
+        app("<div>No areas of concern detected based on current matrix.</div>\n")
+    app("</body></html>\n")
+
+    with open("segmentation_matrix.html", "w") as f:
+        f.write("".join(out))
+
+    print(f"\n{CYAN}HTML report generated: segmentation_matrix.html{RESET}")
+    sys.stdout.flush()
 
-print(f"\n{CYAN}HTML report generated: segmentation_matrix.html{RESET}")
+if __name__ == "__main__":
+    main()